@@ -29,80 +29,115 @@
 #   server plug-in, install the application to each cluster with a unique application name and 
 #   context root.
 
-import sys
-import time
+import argparse
 import os
+import sys
+from java.lang import System
+from java.text import SimpleDateFormat
+from java.util import Date
+from java.util.concurrent import Callable, ExecutionException, Executors
+
+# Formatting straight through Java avoids time.strftime's %Z, which looks up
+# the zone display name on every call under Jython. Only the main thread logs.
+_fmt = SimpleDateFormat("yyyy-MM-dd HH:mm:ss z")
+# [epoch second, formatted timestamp] of the last message logged
+_last_sec = [-1, ""]
 
-def usage(error=""):
-    if error != "":
-        error(error)
-    info("usage: wsadmin -lang jython -f multiClusterAdminAppDeploy.py --earpath <EAR_fully_qualified_path>")
-    info("  Example: /opt/IBM/WebSphere/AppServer/installableApps/WebSphereOIDCRP.ear")
-    os._exit() # couldn't get sys.exit(1) to work properly
+def timestamp():
+  t = System.currentTimeMillis() // 1000
+  if t != _last_sec[0]:
+    _last_sec[0] = t
+    _last_sec[1] = _fmt.format(Date(t * 1000))
+  return _last_sec[1]
 
 def info(obj):
-  print("INFO [%s] %s" % (time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()), str(obj)))
+  print("INFO [%s] %s" % (timestamp(), str(obj)))
 
 def warning(obj):
-  print("WARN [%s] %s" % (time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()), str(obj)))
+  print("WARN [%s] %s" % (timestamp(), str(obj)))
 
 def error(obj):
-  print("ERR  [%s] %s" % (time.strftime("%Y-%m-%d %H:%M:%S %Z", time.localtime()), str(obj)))
+  print("ERR  [%s] %s" % (timestamp(), str(obj)))
 
 SCRIPT_NAME = "multiClusterAdminAppDeploy.py"
 SCRIPT_VERSION = "0.1.20250807"
+START_POOL_SIZE = 4 # concurrent startApplicationOnCluster calls
 JYTHON_VERSION = sys.version_info
 
 info(SCRIPT_NAME + " " + SCRIPT_VERSION + " Jython: " + str(JYTHON_VERSION.major) + "." + str(JYTHON_VERSION.minor) + "." + str(JYTHON_VERSION.micro))
 
-l = len(sys.argv)
-i = 0
-help_flag = False
-ear_file = None
-
-while i < l:
-  arg = sys.argv[i]
-  if arg == "--help" or arg == "--h" or arg == "--usage" or arg == "--?":
-    help_flag = True
-    break
-  elif arg == "--earpath":
-    i += 1
-    if i < l:
-        ear_file = sys.argv[i]
-    else:
-        error("--earfile requires a file path argument.")
-        help_flag = True
-  else:
-    error("Unknown argument " + arg)
-    help_flag = True
-  i += 1
-
-if help_flag:
-  usage()
+ap = argparse.ArgumentParser(prog="wsadmin -lang jython -f " + SCRIPT_NAME, add_help=False,
+                             description="Install WebSphereOIDCRP on each cluster in the cell.",
+                             epilog="Example: --earpath /opt/IBM/WebSphere/AppServer/installableApps/WebSphereOIDCRP.ear")
+ap.add_argument("-h", "--help", "--h", "--usage", "--?", action="help", help="Show this help message and exit.")
+ap.add_argument("--earpath", required=True, help="Fully qualified path to the WebSphereOIDCRP EAR file.")
+# wsadmin passes only the script arguments in sys.argv, without the script name.
+try:
+  args = ap.parse_args(sys.argv)
+except SystemExit as e:
+  # argparse exits via sys.exit for -h and for bad arguments; os._exit skips
+  # the interpreter shutdown, so flush its usage text first.
+  sys.stdout.flush()
+  sys.stderr.flush()
+  os._exit(e.code) # couldn't get sys.exit(1) to work properly under wsadmin
+ear_file = args.earpath
+
+class StartApplication(Callable):
+  def __init__(self, app_name, cluster_name):
+    self.app_name = app_name
+    self.cluster_name = cluster_name
+
+  def call(self):
+    AdminApplication.startApplicationOnCluster(self.app_name, self.cluster_name)
+    return self.app_name
 
 default_app_name = 'WebSphereOIDCRP'
-ear_file = '/opt/IBM/WebSphere/AppServer/installableApps/WebSphereOIDCRP.ear'
+# Same for every cluster; AdminApp does not modify the option lists it is given.
+SERVLET = 'OIDC Relying Party callback Servlet'
+MOD = 'com.ibm.ws.security.oidc.servlet.war,WEB-INF/web.xml'
+VH_TEMPLATE = [[SERVLET, MOD, 'default_host']]
 clusters = AdminClusterManagement.listClusters()
+deployed = []
 for cluster in clusters:
     cluster_name = cluster.split('(')[0]
     app_name = default_app_name + '_' + cluster_name
     print("Installing {} on cluster {} with default context root.".format(app_name, cluster_name))
-    AdminApp.install(ear_file, ['-appname', app_name, '-cluster', cluster_name, '-MapWebModToVH', \
-        [['OIDC Relying Party callback Servlet', \
-        'com.ibm.ws.security.oidc.servlet.war,WEB-INF/web.xml', 'default_host']]])
+    try:
+        AdminApp.install(ear_file, ['-appname', app_name, '-cluster', cluster_name, '-MapWebModToVH', VH_TEMPLATE])
+    except Exception as e:
+        print("Failed to install application {} on cluster {}: {}".format(app_name, cluster_name, e))
+        continue
     try:
         contextRoot = "oidcclient_" + cluster_name
-        edit_args = [
-            '-CtxRootForWebMod',
-            "[{contextRoot}, com.ibm.ws.security.oidc.servlet.war,WEB-INF/web.xml]"
-        ]
-        AdminApp.edit(app_name, '[ -CtxRootForWebMod [[ "OIDC Relying Party callback Servlet" \
-            com.ibm.ws.security.oidc.servlet.war,WEB-INF/web.xml /' + contextRoot + ' ]]]' )
+        AdminApp.edit(app_name, "".join(['[ -CtxRootForWebMod [[ "', SERVLET, '" ', MOD, ' /', contextRoot, ' ]]]']))
         print("Application {} edited successfully on cluster {}.".format(app_name, cluster_name))        
     except Exception as e:
         print("Failed to edit application {} on cluster {}: {}".format(app_name, cluster_name, e))
-    AdminConfig.save()
+    deployed.append((app_name, cluster_name))
+
+# Installs share the one configuration workspace, so they run serially above;
+# a single save and sync then covers every cluster. If the save fails, discard
+# the whole workspace rather than leave some clusters half configured.
+if deployed:
+    try:
+        AdminConfig.save()
+    except Exception as e:
+        print("Failed to save the configuration, discarding all changes: {}".format(e))
+        AdminConfig.reset()
+        deployed = []
+
+# Starting the applications is independent per cluster, so fan it out.
+if deployed:
     AdminNodeManagement.syncActiveNodes()
-    AdminApplication.startApplicationOnCluster(app_name, cluster_name)
+    pool = Executors.newFixedThreadPool(min(START_POOL_SIZE, len(deployed)))
+    try:
+        futures = pool.invokeAll([StartApplication(app_name, cluster_name) for app_name, cluster_name in deployed])
+        for (app_name, cluster_name), future in zip(deployed, futures):
+            try:
+                future.get()
+            except ExecutionException as e:
+                print("Failed to start application {} on cluster {}: {}".format(app_name, cluster_name, e.getCause()))
+    finally:
+        pool.shutdown()
 print("Script execution completed.")
 
@@ -13,36 +13,107 @@ Assumptions:
 """
 
 import argparse
+import heapq
 import re
+import sys
 from collections import defaultdict
 
-LINE_RE = re.compile(
-    r"""
-    ^(?P<ts>\d{2}[:.]\d{2}[:.]\d{2}[:.]\d{3})   # timestamp HH[:|.]MM[:|.]SS[:|.]mmm
-    \s+(?P<tid>0x[0-9a-fA-F]+)                  # thread id like 0x2a7b500
-    \s+.*?                                      # slack columns (e.g., 'mt.3', counters)
-    (?P<arrow>[<>])                             # entry/exit marker
-    \s+(?P<method>\S+)                          # method signature (no spaces)
-    """,
-    re.VERBOSE,
-)   
+# Slow-path matcher over the raw bytes of a line, used with match() (anchored).
+# Groups: 1 timestamp HH[:|.]MM[:|.]SS[:|.]mmm, 2 thread id like 0x2a7b500,
+# 3 entry/exit marker, 4 method signature (no spaces). Anything between the
+# thread id and the marker is slack columns (e.g., 'mt.3', counters).
+LINE_RE = re.compile(rb'^(\d\d[:.]\d\d[:.]\d\d[:.]\d{3})\s+(0x[0-9a-fA-F]+)\s+.*?([<>])\s+(\S+)')
+
+# Read size for the logfile; traces are often several GB.
+CHUNK_SIZE = 1 << 20
+
+# LINE_RE only looks at this many leading bytes unless the line needs more.
+REGEX_HEAD = 256
+
+# Stack entries pack (method_id << START_BITS) | start_ms into one int.
+# 40 bits of milliseconds is ~34 years, ample for day-rollover offsets.
+START_BITS = 40
+START_MASK = (1 << START_BITS) - 1
+
+HEX_DIGITS = frozenset(b'0123456789abcdefABCDEF')
 
 def parse_ts_ms(ts: str) -> int:
-    """Convert HH[:|.]MM[:|.]SS[:|.]mmm to milliseconds since start of day."""
-    ts = ts.replace('.', ":")
-    h, m, s, ms = map(int, ts.split(':'))
+    """Convert HH[:|.]MM[:|.]SS[:|.]mmm to milliseconds since start of day.
+
+    A 12-character ts is folded from its character codes without validation, so
+    the caller must already have checked the digits and separators (iter_lines
+    does, on both of its paths); other widths are split and parsed with int().
+    """
+    if len(ts) != 12:
+        # Slow path for anything that isn't the fixed-width layout.
+        h, m, s, ms = map(int, ts.replace('.', ':').split(':'))
+        return ((h * 60 + m) * 60 + s) * 1000 + ms
+    # Fixed-width digits: fold each field straight from the character codes
+    # (48 == ord('0')), skipping the separators at 2, 5 and 8.
+    _ord = ord
+    h = _ord(ts[0]) * 10 + _ord(ts[1]) - 528
+    m = _ord(ts[3]) * 10 + _ord(ts[4]) - 528
+    s = _ord(ts[6]) * 10 + _ord(ts[7]) - 528
+    ms = _ord(ts[9]) * 100 + _ord(ts[10]) * 10 + _ord(ts[11]) - 5328
     return ((h * 60 + m) * 60 + s) * 1000 + ms
 
-def iter_lines(fp):
-    for ln, raw in enumerate(fp, 1):
-        line = raw.rstrip('\n')
-        if not line.strip():
-            continue
-        m = LINE_RE.search(line)
-        if not m:
-            # Skip unrecognized lines, but you could `print` to stderr if you wanted.
-            continue
-        yield ln, m.group('ts'), m.group('tid'), m.group('arrow'), m.group('method')
+def iter_lines(fp, method_ids):
+    """Yield (ln, ts, tid, arrow, method_id) from a binary file, read in CHUNK_SIZE blocks.
+
+    Lines are parsed as raw bytes and only the timestamp is decoded; tid and arrow
+    stay bytes. Method signatures are mapped to small integer ids, assigned in
+    order of first appearance and recorded in method_ids (raw bytes -> id);
+    compute_stats decodes the names as UTF-8 once at the end.
+    """
+    ln = 0
+    tail = b''
+    eof = False
+    while not eof:
+        chunk = fp.read(CHUNK_SIZE)
+        if chunk:
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop() # partial last line, completed by the next read
+        else:
+            eof = True
+            lines = [tail] if tail else []
+        for raw in lines:
+            ln += 1
+            if not raw.strip():
+                continue
+            # Fast path: the common "ts tid mt.N > method ..." layout is positional,
+            # so a single split is enough and the regex engine never runs.
+            # The columns are validated as strictly as LINE_RE would (parse_ts_ms
+            # trusts fixed-width digits); anything else goes to the slow path.
+            # bytes.split() and isdigit() only know ASCII, so multibyte UTF-8 in a
+            # method name is never mistaken for whitespace.
+            # split() would also skip leading whitespace, which the anchored LINE_RE
+            # rejects, so the line must start with the timestamp's first digit.
+            parts = raw.split(None, 5)
+            if raw[:1].isdigit() and len(parts) >= 5 and parts[3] in (b'>', b'<'):
+                ts, tid = parts[0], parts[1]
+                if (len(ts) == 12 and ts[2:3] in b':.' and ts[5:6] in b':.' and ts[8:9] in b':.'
+                        and ts[:2].isdigit() and ts[3:5].isdigit()
+                        and ts[6:8].isdigit() and ts[9:].isdigit()
+                        and len(tid) > 2 and tid.startswith(b'0x') and HEX_DIGITS.issuperset(tid[2:])):
+                    yield ln, ts.decode('ascii'), tid, parts[3], method_ids.setdefault(parts[4], len(method_ids))
+                    continue
+            # Slow path: extra slack columns. Substring checks are far cheaper than
+            # a failed regex search, so reject lines without a tid or an arrow first
+            # (whitespace-agnostic, since LINE_RE separates columns with \s+).
+            if b'0x' not in raw:
+                continue
+            if b'>' not in raw and b'<' not in raw:
+                continue
+            # The fields sit at the start of the line; only rescan the whole line if
+            # the head didn't match or the method ran up to the cut-off.
+            m = LINE_RE.match(raw, 0, REGEX_HEAD)
+            if len(raw) > REGEX_HEAD and (m is None or m.end() == REGEX_HEAD):
+                m = LINE_RE.match(raw)
+            if not m:
+                # Skip unrecognized lines, but you could `print` to stderr if you wanted.
+                continue
+            ts, tid, arrow, method = m.groups()
+            yield ln, ts.decode('ascii'), tid, arrow, method_ids.setdefault(method, len(method_ids))
 
 def ellipsize_method(text: str, max_len: int, ellipsis: str = "...") -> str:
     """Return text shortened with a middle ellipsis to fit max_len."""
@@ -59,17 +130,26 @@ def ellipsize_method(text: str, max_len: int, ellipsis: str = "...") -> str:
     return text[:left] + ellipsis + (text[-right:] if right > 0 else "")
 
 def compute_stats(path: str):
-    # Per-thread call stack: tid -> [(method, start_ms_abs)]
-    stacks = defaultdict(list)
-    # Stats per method: method -> {'count': int, 'total_ms': int}
-    stats = defaultdict(lambda: {'count': 0, 'total_ms': 0})
+    # Method signature -> integer id; the loop below only ever sees the ids.
+    method_ids = {}
+    # Per-thread call stack: tid -> [(method_id << START_BITS) | start_ms_abs]
+    # (plain dict: a thread only gets a list once it actually pushes)
+    stacks = {}
+    # Stats per method, kept as parallel maps: method_id -> count, method_id -> total_ms
+    counts = defaultdict(int)
+    totals = defaultdict(int)
 
     last_abs_ms = None
     day_offset = 0 # to handle midnight rollovers
+    # Consecutive lines often share a timestamp; remember the last one parsed.
+    last_ts_str = None
+    ms = 0
 
-    with open(path, 'r', errors='replace') as fp:
-        for ln, ts_str, tid, arrow, method in iter_lines(fp):
-            ms = parse_ts_ms(ts_str)
+    with open(path, 'rb', buffering=CHUNK_SIZE) as fp:
+        for ln, ts_str, tid, arrow, mid in iter_lines(fp, method_ids):
+            if ts_str != last_ts_str:
+                ms = parse_ts_ms(ts_str)
+                last_ts_str = ts_str
             # Handle day rollover: if time goes backwards, assume next day
             abs_ms = ms + day_offset
             if last_abs_ms is not None and abs_ms < last_abs_ms:
@@ -77,46 +157,59 @@ def compute_stats(path: str):
                 abs_ms = ms + day_offset
             last_abs_ms = abs_ms
 
-            if arrow == '>':
-                stacks[tid].append((method, abs_ms))
-            else: # arrow == '<'
-                if not stacks[tid]:
+            if arrow == b'>':
+                stk = stacks.get(tid)
+                if stk is None:
+                    stk = stacks[tid] = []
+                stk.append((mid << START_BITS) | abs_ms)
+            else: # arrow == b'<'
+                stk = stacks.get(tid)
+                if not stk:
                     # No matching start on this thread; skip or log as needed
                     continue
 
-                # Pop until we find the matching method (handles occasional mismatches)
-                temp = []
-                start_method = None
-                start_ms = None
-                while stacks[tid]:
-                    mth, s_ms = stacks[tid].pop()
-                    if mth == method:
-                        start_method, start_ms = mth, s_ms
+                # Scan down from the top for the matching method (handles occasional
+                # mismatches); only the matched entry is removed, the rest stay put.
+                for i in range(len(stk) - 1, -1, -1):
+                    v = stk[i]
+                    if v >> START_BITS == mid:
+                        start_ms = v & START_MASK
+                        del stk[i]
                         break
-                    temp.append((mth, s_ms))
-                # Put back anything we popped that wasn't the match
-                while temp:
-                    stacks[tid].append(temp.pop())
-
-                if start_method is None:
+                else:
                     # Didn't find a matching start; skip
                     continue
 
                 dur = abs_ms - start_ms
                 if dur >=0:
-                    s = stats[method]
-                    s['count'] += 1
-                    s['total_ms'] += dur
+                    counts[mid] += 1
+                    totals[mid] += dur
     
-    # Build result list with averages.
-    result = []
-    for method, s in stats.items():
-        avg = s['total_ms'] / s['count'] if s['count'] else 0.0
-        result.append((method, s['count'], s['total_ms'], avg))
+    # Decode the raw names the way the old text-mode read with errors='replace'
+    # did (Java identifiers need not be ASCII).
+    names = [None] * len(method_ids)
+    for method, mid in method_ids.items():
+        names[mid] = method.decode('utf-8', 'replace')
+    # Only for invalid UTF-8: distinct raw names can then decode to the same
+    # replacement text, which the text-mode read counted as one method.
+    merged = {}
+    for mid, count in counts.items():
+        c, t = merged.get(names[mid], (0, 0))
+        merged[names[mid]] = (c + count, t + totals[mid])
 
-    # Sort by descending average duration, then by count
-    result.sort(key=lambda x: (-x[3], -x[1], x[0]))
-    return result
+    # Yield result rows with averages. Every method in merged has count >= 1,
+    # so the average needs no zero guard. Unsorted; main picks the order (and
+    # how many rows) it needs.
+    return ((method, count, total_ms, total_ms / count) for method, (count, total_ms) in merged.items())
+
+# Row ordering per --sort over (method, count, total_ms, avg_ms) rows.
+# Ties fall back to avg desc, count desc, then method name.
+SORT_KEYS = {
+    "avg": lambda x: (-x[3], -x[1], x[0]),
+    "count": lambda x: (-x[1], -x[3], x[0]),
+    "total": lambda x: (-x[2], -x[1], x[0]),
+    "method": lambda x: (x[0].lower(), -x[3], -x[1], x[0]),
+}
 
 def main():
     ap = argparse.ArgumentParser(description="Compute per-method counts and average durations from Xtrace iprint logs.")
@@ -134,16 +227,12 @@ def main():
 
     rows = compute_stats(args.logfile)
 
-    if args.sort == "count":
-        rows.sort(key=lambda x: (-x[1], -x[3], x[0]))
-    elif args.sort == "total":
-        rows.sort(key=lambda x: (-x[2], -x[1], x[0]))
-    elif args.sort == "method":
-        rows.sort(key=lambda x: x[0].lower())
-    # else default already sorted by avg desc
-
+    # With --top only the first N rows are needed, so skip the full sort.
+    key = SORT_KEYS[args.sort]
     if args.top and args.top > 0:
-        rows = rows[:args.top]
+        rows = heapq.nsmallest(args.top, rows, key=key)
+    else:
+        rows = sorted(rows, key=key)
 
     # Determine the column width
     if args.ellipsize:
@@ -161,10 +250,28 @@ def main():
     print(header)
     print("-" * len(header))
 
-    # Print the rows.
+    # The width is fixed for the whole run, so work out ellipsize_method's split
+    # once; narrow widths (where the right half would be empty) use the general one.
+    if args.width > 4:
+        keep = args.width - 3
+        left = (keep + 1) // 2
+        right = keep - left
+        def ell(t, _l=left, _r=right, _w=args.width):
+            return t if len(t) <= _w else t[:_l] + "..." + t[-_r:]
+    else:
+        def ell(t, _w=args.width):
+            return ellipsize_method(t, _w)
+
+    # Print the rows, batched into one write per 1024 lines.
+    write = sys.stdout.write
+    out = []
     for method, count, total_ms, avg_ms in rows:
-        name = ellipsize_method(method, args.width) if args.ellipsize else method
-        print(f"{name:<{method_col_width}} {count:>7d} {total_ms:>12d} {avg_ms:>10.3f}")
+        name = ell(method) if args.ellipsize else method
+        out.append(f"{name:<{method_col_width}} {count:>7d} {total_ms:>12d} {avg_ms:>10.3f}\n")
+        if len(out) == 1024:
+            write("".join(out))
+            out.clear()
+    write("".join(out))
     
 if __name__ == "__main__":
     main()